@@ -1,147 +1,324 @@
 import asyncio
-import json
+import atexit
+import heapq
+import itertools
+import logging
 import os
+import queue
+import threading
 import time
-import aiohttp
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union, Tuple
-from functools import wraps, lru_cache
-from pydantic import BaseModel, Field
+import httpx
+import orjson
+from cachetools import TLRUCache, TTLCache
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Any, Union, Tuple, Callable, Awaitable
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
 from fastmcp import FastMCP
 from firestore_client import FirestoreClient
 from dotenv import load_dotenv
-from ratelimit import limits, sleep_and_retry
+from redis.asyncio import Redis
 from tenacity import (
     retry,
     stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-    RetryCallState
+    wait_random_exponential,
+    retry_if_exception,
+    RetryCallState,
 )
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Initialize FastMCP
 mcp = FastMCP(name="Travel MCP Server")
 
 # Initialize shared clients
-firestore_client = FirestoreClient(credentials_path=os.getenv("GOOGLE_APPLICATION_CREDENTIALS"))
+# A small pool of Firestore clients, used round-robin, spreads concurrent reads
+# over several gRPC channels; set FIRESTORE_POOL_SIZE=1 for a single client.
+# The first entry is the process-wide shared client, the rest get their own channel.
+# Credentials come from GOOGLE_APPLICATION_CREDENTIALS / ADC.
+FIRESTORE_POOL_SIZE = max(1, int(os.getenv("FIRESTORE_POOL_SIZE", "4")))
+_firestore_pool: List[FirestoreClient] = [
+    FirestoreClient(dedicated=i > 0) for i in range(FIRESTORE_POOL_SIZE)
+]
+_firestore_rr = itertools.cycle(_firestore_pool)
+firestore_client = _firestore_pool[0]
+
+def _firestore() -> FirestoreClient:
+    """Next Firestore client from the pool."""
+    return next(_firestore_rr)
+
+# HTTP sessions for connection pooling, one per event loop (a session cannot be shared across loops)
+_sessions: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+# Long-lived loop for synchronous callers, so their pooled session survives between calls
+_bg_loop = asyncio.new_event_loop()
+_bg_thread = threading.Thread(target=_bg_loop.run_forever, name="dynotrip-bg-loop", daemon=True)
+_bg_thread.start()
 
-# Global HTTP session for connection pooling
-session = None
+# Constants
+PLACES_BASE_URL = "https://places.googleapis.com/v1/places"
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+WEATHER_URL = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/"
+CACHE_TTL = 3600  # 1 hour
+PLACES_CACHE_TTL = 86400  # place listings change rarely; 24 hours
+NEGATIVE_CACHE_TTL = 300  # known misses are re-checked after 5 minutes
+# Prefix for every cache key; bump it whenever a field mask or cached response shape changes
+CACHE_SCHEMA = "v3"
+L1_CACHE_TTL = 60  # in-process copy of hot Redis keys; kept well under the Redis TTLs
+CONCURRENT_REQUESTS = 10  # Max concurrent requests
+KEEPALIVE_EXPIRY = 60.0  # idle upstream connections survive the gap between bursty batch calls
 
 # In-memory cache
 class SimpleCache:
-    def __init__(self):
-        self._cache = {}
-        self._expiry = {}
+    """Bounded in-process cache: entries expire after their own TTL and the least recently used are evicted."""
+    def __init__(self, maxsize: int = 10_000, ttl: int = CACHE_TTL):
+        self._ttl = ttl
+        # Entries are stored as (value, ttl) so each key can carry its own expiry
+        self._cache = TLRUCache(maxsize=maxsize, ttu=lambda _key, entry, now: now + entry[1])
+        # TLRUCache is not thread-safe and the sync wrapper's background loop runs in its own thread
+        self._lock = threading.Lock()
     
-    async def get(self, key: str) -> Optional[Any]:
-        if key in self._expiry and self._expiry[key] < time.time():
-            self._cache.pop(key, None)
-            self._expiry.pop(key, None)
-            return None
-        return self._cache.get(key)
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._cache.get(key)
+        return entry[0] if entry is not None else None
     
-    async def set(self, key: str, value: Any, ex: int = None):
-        self._cache[key] = value
-        if ex is not None:
-            self._expiry[key] = time.time() + ex
+    def set(self, key: str, value: Any, ex: int = None):
+        with self._lock:
+            self._cache[key] = (value, ex or self._ttl)
 
 # Initialize in-memory cache
 cache = SimpleCache()
-
-# Constants
-PLACES_BASE_URL = "https://places.googleapis.com/v1/places"
-GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
-WEATHER_URL = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/"
-CACHE_TTL = 3600  # 1 hour
-RATE_LIMIT = 50  # requests per minute
-CONCURRENT_REQUESTS = 10  # Max concurrent requests
-
-# Request model for batching
-class PlaceSearchRequest(BaseModel):
+# Small L1 in front of Redis so hot keys skip the network round-trip (unused without Redis)
+_l1 = SimpleCache(maxsize=1024, ttl=L1_CACHE_TTL)
+
+# API keys are read once at import; tools report a missing key per call, warn here once
+GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
+if not GOOGLE_MAPS_API_KEY:
+    logger.warning("GOOGLE_MAPS_API_KEY is not set; place lookups will fail")
+if not WEATHER_API_KEY:
+    logger.warning("WEATHER_API_KEY is not set; weather summaries are disabled")
+
+# Optional shared cache; falls back to the in-memory cache when REDIS_URL is unset
+REDIS_URL = os.getenv("REDIS_URL")
+# Pooled Redis connections bind to the loop that opened them, so keep one client per loop
+_redis_clients: Dict[asyncio.AbstractEventLoop, Redis] = {}
+
+def _get_redis() -> Optional[Redis]:
+    """Redis client for the running loop, created on first use; None when Redis is not configured."""
+    if not REDIS_URL:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _redis_clients.get(loop)
+    if client is None:
+        client = _redis_clients[loop] = Redis.from_url(REDIS_URL, decode_responses=True)
+    return client
+
+# Request descriptors for batching; internal plumbing, so plain slotted dataclasses rather than validated models
+@dataclass(slots=True)
+class PlaceSearchRequest:
     text_query: str
-    session: aiohttp.ClientSession
-    result: dict = Field(default_factory=dict)
-    future: asyncio.Future = None
+    session: httpx.AsyncClient
+    result: dict = field(default_factory=dict)
+    future: Optional[asyncio.Future] = None
 
-class PlaceDetailsRequest(BaseModel):
+@dataclass(slots=True)
+class PlaceDetailsRequest:
     place_id: str
-    session: aiohttp.ClientSession
-    result: dict = Field(default_factory=dict)
-    future: asyncio.Future = None
-
-# Rate limiting
-RATE_LIMIT_PER_MINUTE = 50
-RATE_LIMIT_PER_DAY = 5000
-
-class RateLimitExceeded(Exception):
-    pass
-
-def rate_limited(calls: int, period: int = 60):
-    """Decorator to limit the number of calls to a function per time period."""
-    def decorator(f):
-        calls_count = 0
-        last_reset = time.time()
-        
-        @wraps(f)
-        async def wrapper(*args, **kwargs):
-            nonlocal calls_count, last_reset
-            
-            # Reset counter if period has passed
-            if time.time() - last_reset > period:
-                calls_count = 0
-                last_reset = time.time()
-                
-            # Check rate limit
-            if calls_count >= calls:
-                sleep_time = period - (time.time() - last_reset)
-                if sleep_time > 0:
-                    await asyncio.sleep(sleep_time)
-                calls_count = 0
-                last_reset = time.time()
-                
-            calls_count += 1
-            return await f(*args, **kwargs)
-            
-        return wrapper
-    return decorator
+    session: httpx.AsyncClient
+    result: dict = field(default_factory=dict)
+    future: Optional[asyncio.Future] = None
+
+# Upstream admission control: one semaphore per loop bounds in-flight Google/weather requests.
+# The connection limits alone don't, since HTTP/2 multiplexes many requests over one connection.
+_http_sems: Dict[asyncio.AbstractEventLoop, asyncio.BoundedSemaphore] = {}
+
+def _http_slot() -> asyncio.BoundedSemaphore:
+    loop = asyncio.get_running_loop()
+    sem = _http_sems.get(loop)
+    if sem is None:
+        sem = _http_sems[loop] = asyncio.BoundedSemaphore(CONCURRENT_REQUESTS)
+    return sem
+
+class AdaptiveTokenBucket:
+    """
+    Per-host request rate that adapts to the upstream: each success raises the rate by `step`
+    (up to `max_rate`), each 429/503 multiplies it by `backoff` (down to `min_rate`) and empties the bucket.
+    """
+    def __init__(self, max_rate: float, min_rate: float = 0.5, step: float = 0.5, backoff: float = 0.5,
+                 capacity: float = CONCURRENT_REQUESTS):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.step = step
+        self.backoff = backoff
+        self.capacity = capacity
+        self.rate = max_rate
+        self._tokens = capacity
+        self._last = time.monotonic()
+        # Shared by the server loop and the sync wrapper's background loop
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token if one is available; otherwise return the seconds until one will be."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        while (wait := self._take()) > 0:
+            await asyncio.sleep(wait)
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.step)
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.backoff)
+            self._tokens = 0
+
+# One bucket per upstream host
+# Ceiling in requests per second per host; the default is high enough that only the
+# upstream's 429/503 responses bring the rate down
+UPSTREAM_MAX_RATE = float(os.getenv("UPSTREAM_MAX_RATE", "1000"))
+_places_bucket = AdaptiveTokenBucket(UPSTREAM_MAX_RATE)
+_geocode_bucket = AdaptiveTokenBucket(UPSTREAM_MAX_RATE)
+_weather_bucket = AdaptiveTokenBucket(UPSTREAM_MAX_RATE)
+
+async def _upstream(bucket: AdaptiveTokenBucket, send: Callable[..., Awaitable[httpx.Response]], url, **kwargs) -> httpx.Response:
+    """Send one upstream request under the host's token bucket and the loop's concurrency cap."""
+    await bucket.acquire()
+    async with _http_slot():
+        resp = await send(url, **kwargs)
+    if resp.status_code in (429, 503):
+        bucket.throttled()
+    elif resp.is_success:
+        bucket.succeeded()
+    return resp
 
 # Async HTTP session management
-async def get_session() -> aiohttp.ClientSession:
-    global session
-    if session is None or session.closed:
-        timeout = aiohttp.ClientTimeout(total=30, connect=10)
-        connector = aiohttp.TCPConnector(
-            limit_per_host=CONCURRENT_REQUESTS,
-            ttl_dns_cache=300,
-            enable_cleanup_closed=True,
-            force_close=False
-        )
-        session = aiohttp.ClientSession(
-            timeout=timeout,
-            connector=connector,
-            json_serialize=json.dumps,
+async def get_session() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.is_closed:
+        # HTTP/2 multiplexes concurrent requests to each Google host over one connection
+        session = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=CONCURRENT_REQUESTS,
+                max_keepalive_connections=CONCURRENT_REQUESTS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
             headers={
                 'Content-Type': 'application/json',
                 'User-Agent': 'DynoTrip/1.0',
             }
         )
+        _sessions[loop] = session
     return session
 
+async def close_session() -> None:
+    """Close the HTTP session and Redis client bound to the running loop, if any."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.pop(loop, None)
+    if session is not None and not session.is_closed:
+        await session.aclose()
+    redis_client = _redis_clients.pop(loop, None)
+    if redis_client is not None:
+        await redis_client.aclose()
+
+def _atexit_cleanup() -> None:
+    try:
+        asyncio.run_coroutine_threadsafe(close_session(), _bg_loop).result(timeout=5)
+    except Exception:
+        pass
+    _bg_loop.call_soon_threadsafe(_bg_loop.stop)
+    _bg_thread.join(timeout=5)
+
+atexit.register(_atexit_cleanup)
+
+async def _serve(**run_kwargs) -> None:
+    """Run the MCP server, then close the clients it opened on this same loop."""
+    try:
+        await mcp.run_async(**run_kwargs)
+    finally:
+        await close_session()
+
+# Firestore reads are blocking gRPC calls; tools run them in worker threads so the server loop stays free
 @mcp.tool
-def get_travel_options(frm: str, to: str, depart_date: str | None = None):
+async def get_travel_options(frm: str, to: str, depart_date: str | None = None):
     """Fetch travel options from Firestore, honoring depart_date when provided."""
-    return firestore_client.get_travel_options(frm, to, depart_date)
+    return await asyncio.to_thread(_firestore().get_travel_options, frm, to, depart_date)
 
 @mcp.tool
-def get_accommodation(city: str):
+async def get_accommodation(city: str):
     """Fetch accommodation options from Firestore."""
-    return firestore_client.get_accommodation(city)
+    return await asyncio.to_thread(_firestore().get_accommodation, city)
+
+@mcp.tool
+async def get_accommodation_batch(cities: List[str]) -> Dict[str, list]:
+    """
+    Fetch accommodation for several cities at once; Firestore 'in' queries cover up to 30 cities each.
+    Returns: {city1: [...], city2: [...], ...}
+    """
+    return await asyncio.to_thread(_firestore().get_accommodation_many, cities)
+
+@mcp.tool
+async def get_trip_options(departure: str, destination: str, start_date: str | None = None, end_date: str | None = None):
+    """
+    Fetch outbound travel, return travel and destination accommodation in one call.
+    The three Firestore reads run concurrently, so latency is that of the slowest read.
+    Returns: { outbound: [...], return: [...], accommodation: [...] }
+    """
+    outbound, inbound, stays = await asyncio.gather(
+        asyncio.to_thread(_firestore().get_travel_options, departure, destination, start_date),
+        asyncio.to_thread(_firestore().get_travel_options, destination, departure, end_date),
+        asyncio.to_thread(_firestore().get_accommodation, destination),
+    )
+    return {"outbound": outbound, "return": inbound, "accommodation": stays}
 
 # ---- Places API (New) helper functions ----
-PLACES_BASE_URL = "https://places.googleapis.com/v1/places"
+# Static request parts, built once; only the query varies per call.
+# Content-Type comes from the session's default headers.
+_PLACES_SEARCH_HEADERS = {
+    'X-Goog-Api-Key': GOOGLE_MAPS_API_KEY or '',
+    'X-Goog-FieldMask': (
+        'places.id,places.displayName,places.formattedAddress,places.googleMapsUri,places.location,'
+        'places.rating,places.userRatingCount,places.photos.name,places.reviews.text,places.reviews.publishTime,'
+        'places.websiteUri,places.nationalPhoneNumber,places.regularOpeningHours'
+    ),
+}
+_PLACES_SEARCH_PAYLOAD = {"maxResultCount": 1, "languageCode": "en"}
+_PLACES_DETAILS_HEADERS = {
+    'X-Goog-Api-Key': GOOGLE_MAPS_API_KEY or '',
+    # Only what _place_details reads: photo names for the media URLs, review text for ranking/output
+    'X-Goog-FieldMask': 'rating,userRatingCount,photos.name,reviews.text,reviews.publishTime',
+}
+_GEOCODE_PARAMS = {'language': 'en', 'region': 'us'}
+# Parsed once; httpx uses URL objects as-is instead of re-parsing a string per request
+_PLACES_SEARCH_URL = httpx.URL(f"{PLACES_BASE_URL}:searchText")
+_GEOCODE_URL = httpx.URL(GEOCODE_URL)
+_WEATHER_PARAMS = {
+    'unitGroup': 'metric',
+    'include': 'days',
+    'elements': 'datetime,temp,tempmin,tempmax,conditions',
+    'contentType': 'json',
+}
+
+def _with_api_key(headers: dict, api_key: str) -> dict:
+    """The prebuilt headers as-is for the configured key; a copy only when a caller passes another key."""
+    return headers if api_key == GOOGLE_MAPS_API_KEY else {**headers, 'X-Goog-Api-Key': api_key}
 
 # Cache management
 async def get_cache(key: str) -> Optional[Any]:
@@ -149,244 +326,438 @@ async def get_cache(key: str) -> Optional[Any]:
     if not key:
         return None
         
-    if redis_client:
+    if (redis_client := _get_redis()) is not None:
+        if (hit := _l1.get(key)) is not None:
+            return hit
         try:
             cached = await redis_client.get(f"dynotrip:{key}")
-            return json.loads(cached) if cached else None
+            if not cached:
+                return None
+            value = orjson.loads(cached)
+            _l1.set(key, value)
+            return value
         except Exception as e:
-            print(f"Cache get error: {e}")
+            logger.warning("Cache get error: %s", e)
             return None
-    return None
+    return cache.get(key)
+
+async def mget_cache(keys: List[str]) -> Dict[str, Any]:
+    """Get several values in one round-trip. Returns only the keys that were found."""
+    if not keys:
+        return {}
+
+    if (redis_client := _get_redis()) is not None:
+        found = {}
+        for k in keys:
+            if (v := _l1.get(k)) is not None:
+                found[k] = v
+        remote = [k for k in keys if k not in found]
+        if not remote:
+            return found
+        try:
+            raw = await redis_client.mget([f"dynotrip:{k}" for k in remote])
+        except Exception as e:
+            logger.warning("Cache mget error: %s", e)
+            return found
+        for k, v in zip(remote, raw):
+            if v:
+                found[k] = orjson.loads(v)
+                _l1.set(k, found[k])
+        return found
+    found = {}
+    for k in keys:
+        if (v := cache.get(k)) is not None:
+            found[k] = v
+    return found
 
 async def set_cache(key: str, value: Any, ttl: int = CACHE_TTL) -> None:
     """Set value in cache with TTL."""
     if not key or value is None:
         return
         
-    if redis_client:
+    if (redis_client := _get_redis()) is not None:
+        _l1.set(key, value, ex=min(ttl, L1_CACHE_TTL))
         try:
             await redis_client.set(
                 f"dynotrip:{key}",
-                json.dumps(value, default=str),
+                orjson.dumps(value, default=str),
                 ex=ttl
             )
         except Exception as e:
-            print(f"Cache set error: {e}")
+            logger.warning("Cache set error: %s", e)
+        return
+    cache.set(key, value, ex=ttl)
 
-# Rate limited and cached API calls
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=4, max=10),
-    retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError)),
-    reraise=True
-)
-async def _places_search_async(text_query: str, api_key: str, session: aiohttp.ClientSession) -> Optional[dict]:
-    """Async implementation of places search with caching and retries."""
-    cache_key = f"places:search:{text_query.lower().strip()}"
-    if cached := await get_cache(cache_key):
-        return cached
+# Concurrent cache misses for the same key share one upstream fetch.
+# Tasks belong to a loop, so entries are keyed by (loop, cache_key).
+_inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Task] = {}
 
-    url = f"{PLACES_BASE_URL}:searchText"
-    headers = {
-        'Content-Type': 'application/json',
-        'X-Goog-Api-Key': api_key,
-        'X-Goog-FieldMask': 'places.id,places.name,places.displayName,places.formattedAddress,places.googleMapsUri',
-    }
-    
+async def _singleflight(key: str, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Await coro_factory() once per key; concurrent callers with the same key get its result.
+    The fetch runs as its own task and every caller, the first included, awaits it through
+    shield, so cancelling one caller neither aborts the fetch nor cancels the others.
+    """
+    loop = asyncio.get_running_loop()
+    inflight_key = (loop, key)
+    task = _inflight.get(inflight_key)
+    if task is None:
+        task = _inflight[inflight_key] = loop.create_task(coro_factory())
+
+        def _done(t: asyncio.Task):
+            if _inflight.get(inflight_key) is t:
+                del _inflight[inflight_key]
+            if not t.cancelled():
+                t.exception()  # mark retrieved even if every caller was cancelled
+        task.add_done_callback(_done)
+    return await asyncio.shield(task)
+
+# Only throttling, server errors and transport failures are worth retrying; other 4xx won't change.
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+class CircuitBreaker:
+    """
+    Opens after `fail_max` consecutive failures. Once `reset_timeout` seconds pass it is half-open and
+    lets a single trial call through: success closes it, failure reopens it. A trial that reports
+    neither (e.g. it ends in a 4xx) is written off after another `reset_timeout`.
+    """
+    def __init__(self, fail_max: int = 10, reset_timeout: float = 30):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None
+        # Shared by the server loop and the sync wrapper's background loop
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            if self._probe_at is not None and now - self._probe_at < self.reset_timeout:
+                return False
+            self._probe_at = now
+            return True
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_at = None
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probe_at is not None or self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+                self._probe_at = None
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open; not retried."""
+
+# Shared by search and details: both hit the same Places backend
+_places_breaker = CircuitBreaker(fail_max=10, reset_timeout=30)
+
+async def _places_upstream(what: str, send: Callable[..., Awaitable[httpx.Response]], url, **kwargs) -> httpx.Response:
+    """
+    One Places request with circuit breaker accounting. Called from inside a singleflight fetch,
+    so a response shared by deduplicated callers is counted once.
+    """
     try:
-        async with session.post(
-            url,
-            headers=headers,
-            json={"textQuery": text_query, "maxResultCount": 1, "languageCode": "en"}
-        ) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
-            result = (data.get('places') or [None])[0]
-            if result:
-                await set_cache(cache_key, result)
-            return result
-    except aiohttp.ClientError as e:
-        print(f"Places search failed: {e}")
+        resp = await _upstream(_places_bucket, send, url, **kwargs)
+        resp.raise_for_status()
+    except httpx.HTTPError as e:
+        if _is_retryable(e):
+            _places_breaker.failure()
+        logger.warning("Places %s failed: %s", what, e)
         raise
+    _places_breaker.success()
+    return resp
+
+RETRY_AFTER_MAX = 30  # seconds; a longer Retry-After is capped rather than stalling the tool call
+
+def _retry_after_seconds(resp: httpx.Response) -> Optional[float]:
+    """Retry-After as seconds; the header may be a delay or an HTTP date."""
+    value = resp.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+_jittered_wait = wait_random_exponential(multiplier=1, max=10)
 
-@retry(
+def _wait_upstream(retry_state: RetryCallState) -> float:
+    """Wait as long as the server asked via Retry-After; jittered exponential backoff otherwise."""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, httpx.HTTPStatusError) and (delay := _retry_after_seconds(exc.response)) is not None:
+        return min(delay, RETRY_AFTER_MAX)
+    return _jittered_wait(retry_state)
+
+_upstream_retry = retry(
     stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=4, max=10),
-    retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError)),
+    wait=_wait_upstream,
+    retry=retry_if_exception(_is_retryable),
     reraise=True
 )
-async def _places_details_async(place_id: str, api_key: str, session: aiohttp.ClientSession) -> Optional[dict]:
-    """Async implementation of places details with caching and retries."""
-    cache_key = f"places:details:{place_id}"
+
+# Cached in place of an empty upstream result so repeated misses skip the network
+_MISS = {"__miss__": True}
+
+def _is_miss(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("__miss__") is True
+
+@lru_cache(maxsize=2048)
+def _norm(text: str) -> str:
+    """Case/whitespace-insensitive form of a query, used in cache keys."""
+    return text.lower().strip()
+
+def _search_cache_key(text_query: str) -> str:
+    return f"{CACHE_SCHEMA}:places:combined:{_norm(text_query)}"
+
+# Rate limited and cached API calls
+@_upstream_retry
+async def _places_search_async(text_query: str, api_key: str, session: httpx.AsyncClient) -> Optional[dict]:
+    """
+    Async implementation of places search with caching and retries.
+    The field mask also requests the detail fields, so one call usually covers place_details.
+    Raises CircuitOpenError while the Places circuit breaker is open.
+    """
+    cache_key = _search_cache_key(text_query)
+    if (cached := await get_cache(cache_key)) is not None:
+        return None if _is_miss(cached) else cached
+
+    if not _places_breaker.allow():
+        raise CircuitOpenError("Places API circuit open")
+
+    url = _PLACES_SEARCH_URL
+    headers = _with_api_key(_PLACES_SEARCH_HEADERS, api_key)
+
+    async def _fetch() -> Optional[dict]:
+        resp = await _places_upstream(
+            "search",
+            session.post,
+            url,
+            headers=headers,
+            content=orjson.dumps({**_PLACES_SEARCH_PAYLOAD, "textQuery": text_query}),
+        )
+        data = orjson.loads(resp.content)
+        result = (data.get('places') or [None])[0]
+        if result:
+            await set_cache(cache_key, result, ttl=PLACES_CACHE_TTL)
+        else:
+            await set_cache(cache_key, _MISS, ttl=NEGATIVE_CACHE_TTL)
+        return result
+
+    return await _singleflight(cache_key, _fetch)
+
+@_upstream_retry
+async def _places_details_async(place_id: str, api_key: str, session: httpx.AsyncClient) -> Optional[dict]:
+    """
+    Async places details lookup; only needed when the search result lacks detail fields.
+    Raises CircuitOpenError while the Places circuit breaker is open.
+    """
+    cache_key = f"{CACHE_SCHEMA}:places:details:{place_id}"
     if cached := await get_cache(cache_key):
         return cached
 
+    if not _places_breaker.allow():
+        raise CircuitOpenError("Places API circuit open")
+
     url = f"{PLACES_BASE_URL}/{place_id}"
-    headers = {
-        'Content-Type': 'application/json',
-        'X-Goog-Api-Key': api_key,
-        'X-Goog-FieldMask': 'rating,userRatingCount,photos,reviews',
-    }
-    
-    try:
-        async with session.get(url, headers=headers) as resp:
-            resp.raise_for_status()
-            result = await resp.json()
-            await set_cache(cache_key, result)
-            return result
-    except aiohttp.ClientError as e:
-        print(f"Places details failed: {e}")
-        raise
+    headers = _with_api_key(_PLACES_DETAILS_HEADERS, api_key)
+
+    async def _fetch() -> Optional[dict]:
+        resp = await _places_upstream("details", session.get, url, headers=headers)
+        result = orjson.loads(resp.content)
+        await set_cache(cache_key, result)
+        return result
 
-async def _geocode_address_async(address: str, api_key: str, session: aiohttp.ClientSession) -> Optional[dict]:
+    return await _singleflight(cache_key, _fetch)
+
+async def _geocode_address_async(address: str, api_key: str, session: httpx.AsyncClient) -> Optional[dict]:
     """Async geocoding with caching and retries."""
     if not address:
         return None
         
-    cache_key = f"geocode:{address.lower().strip()}"
-    if cached := await get_cache(cache_key):
-        return cached
-    
-    params = {
-        'address': address,
-        'key': api_key,
-        'language': 'en',
-        'region': 'us',
-    }
+    cache_key = f"{CACHE_SCHEMA}:geocode:{_norm(address)}"
+    if (cached := await get_cache(cache_key)) is not None:
+        return None if _is_miss(cached) else cached
     
+    params = {**_GEOCODE_PARAMS, 'address': address, 'key': api_key}
+
+    async def _fetch() -> Optional[dict]:
+        resp = await _upstream(_geocode_bucket, session.get, _GEOCODE_URL, params=params)
+        resp.raise_for_status()
+        data = orjson.loads(resp.content)
+
+        if results := data.get('results'):
+            loc = results[0].get('geometry', {}).get('location')
+            if loc:
+                result = {"lat": float(loc.get('lat', 0)), "lng": float(loc.get('lng', 0))}
+                await set_cache(cache_key, result)
+                return result
+        await set_cache(cache_key, _MISS, ttl=NEGATIVE_CACHE_TTL)
+        return None
+
     try:
-        async with session.get(GEOCODE_URL, params=params) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
-            
-            if results := data.get('results'):
-                loc = results[0].get('geometry', {}).get('location')
-                if loc:
-                    result = {"lat": float(loc.get('lat', 0)), "lng": float(loc.get('lng', 0))}
-                    await set_cache(cache_key, result)
-                    return result
+        return await _singleflight(cache_key, _fetch)
     except Exception as e:
-        print(f"Geocoding failed: {e}")
+        logger.warning("Geocoding failed: %s", e)
         
     return None
 
-async def _fetch_weather_summary_async(lat: float, lng: float, days: int = 3, api_key: str = None) -> dict:
+async def _fetch_weather_summary_async(lat: float, lng: float, days: int = 3, api_key: str = None,
+                                       session: Optional[httpx.AsyncClient] = None) -> dict:
     """Async weather fetching with caching."""
-    if not api_key:
-        api_key = os.getenv('WEATHER_API_KEY')
+    api_key = api_key or WEATHER_API_KEY
     if not api_key:
         return {}
         
-    cache_key = f"weather:{lat:.4f},{lng:.4f}:{days}"
+    cache_key = f"{CACHE_SCHEMA}:weather:{lat:.4f},{lng:.4f}:{days}"
     if cached := await get_cache(cache_key):
         return cached
         
-    params = {
-        'key': api_key,
-        'unitGroup': 'metric',
-        'include': 'days',
-        'elements': 'temp,conditions',
-        'contentType': 'json',
-    }
-    
+    params = {**_WEATHER_PARAMS, 'key': api_key}
+
+    async def _fetch() -> dict:
+        client = session or await get_session()
+        url = f"{WEATHER_URL}{lat},{lng}/next{days}days"
+        resp = await _upstream(_weather_bucket, client.get, url, params=params)
+        resp.raise_for_status()
+        data = orjson.loads(resp.content)
+
+        if 'days' in data:
+            result = {
+                day['datetime']: {
+                    'summary': day.get('conditions', 'Unknown'),
+                    'avg_temp': day.get('temp'),
+                    'temp_min': day.get('tempmin'),
+                    'temp_max': day.get('tempmax'),
+                }
+                for day in data['days']
+            }
+            await set_cache(cache_key, result, ttl=3600)  # Cache for 1 hour
+            return result
+        return {}
+
     try:
-        async with aiohttp.ClientSession() as session:
-            url = f"{WEATHER_URL}/{lat},{lng}/next{days}days"
-            async with session.get(url, params=params) as resp:
-                resp.raise_for_status()
-                data = await resp.json()
-                
-                if 'days' in data:
-                    result = {
-                        day['datetime']: {
-                            'summary': day.get('conditions', 'Unknown'),
-                            'avg_temp': day.get('temp'),
-                            'temp_min': day.get('tempmin'),
-                            'temp_max': day.get('tempmax'),
-                        }
-                        for day in data['days']
-                    }
-                    await set_cache(cache_key, result, ttl=3600)  # Cache for 1 hour
-                    return result
+        return await _singleflight(cache_key, _fetch)
     except Exception as e:
-        print(f"Weather API error: {e}")
+        logger.warning("Weather API error: %s", e)
         
     return {}
 
 @mcp.tool
-async def place_details_async(query: str) -> dict:
+async def place_details_async(query: str, max_photos: int = 3) -> dict:
     """
     Async version of place_details with better performance.
     Fetch place details via Google Places API (New).
+    `max_photos` caps the photo URLs returned (0-3); pass what will actually be shown.
     Returns: { rating, total_ratings, photos: [url...], reviews: [text...] }
     """
-    api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+    return _limit_photos(await _place_details(query), max_photos)
+
+# Fully assembled place_details responses, so repeat lookups skip the cache round-trip and the rebuild.
+# Sync callers read it directly, without handing off to the background loop.
+_result_cache = TTLCache(maxsize=5000, ttl=CACHE_TTL)
+_result_lock = threading.Lock()
+
+def _cached_result(query: str) -> Optional[dict]:
+    with _result_lock:
+        return _result_cache.get(_norm(query))
+
+def _store_result(query: str, result: dict) -> dict:
+    if 'error' not in result:
+        with _result_lock:
+            _result_cache[_norm(query)] = result
+    return result
+
+def _limit_photos(result: dict, max_photos: int) -> dict:
+    """Trim a response's photo URLs; cached responses are shared, so this returns a copy when trimming."""
+    photos = result.get('photos')
+    if not photos or len(photos) <= max_photos:
+        return result
+    return {**result, 'photos': photos[:max(0, max_photos)]}
+
+def _safe_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _safe_int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return 0
+
+def _review_text(review: dict) -> Optional[str]:
+    text = review.get('text')
+    if isinstance(text, dict):
+        text = text.get('text')
+    return text if isinstance(text, str) else None
+
+async def _place_details(query: str, found: Optional[dict] = None) -> dict:
+    """Body of place_details_async; `found` lets batch callers pass a pre-fetched search result."""
+    api_key = GOOGLE_MAPS_API_KEY
     if not api_key:
         return {"error": "GOOGLE_MAPS_API_KEY not configured"}
     if not query:
         return {"error": "query cannot be empty"}
+    if (hit := _cached_result(query)) is not None:
+        return hit
     
     session = await get_session()
     
     try:
         # Search for the place
-        found = await _places_search_async(query, api_key, session)
-        if not found:
+        if found is None:
+            found = await _places_search_async(query, api_key, session)
+        if not found or _is_miss(found):
             return {"error": "Place not found"}
         
         # Extract place ID
         place_id = found.get('id')
         if not place_id:
-            name_field = found.get('name', '')
-            if isinstance(name_field, str) and name_field.startswith('places/'):
-                place_id = name_field.split('/', 1)[1]
+            name_field = found.get('name')
+            if isinstance(name_field, str) and (stripped := name_field.removeprefix('places/')) != name_field:
+                place_id = stripped
         
         if not place_id:
             return {"error": "Could not extract place ID"}
         
-        # Get place details
-        details = await _places_details_async(place_id, api_key, session)
+        # The search result carries the detail fields; fall back to a details call only if absent
+        if any(k in found for k in ('rating', 'userRatingCount', 'photos', 'reviews')):
+            details = found
+        else:
+            details = await _places_details_async(place_id, api_key, session)
         if not details:
             return {"error": "Could not fetch place details"}
         
-        # Prepare photos (up to 3)
-        photos = []
-        photo_objects = details.get('photos', [])
-        
-        # Process photos concurrently
-        photo_tasks = []
-        for i, p in enumerate(photo_objects[:3], 1):
-            pname = p.get('name')
-            if pname:
-                # Extract the photo reference properly
-                photo_ref = pname.split('/')[-1]  # Get just the photo reference part
-                photo_url = f"https://places.googleapis.com/v1/places/{place_id}/photos/{photo_ref}/media?key={api_key}&maxWidthPx=600"
-                photos.append(photo_url)
-                
-                # Add a small delay between photo requests to avoid rate limiting
-                if i < len(photo_objects[:3]) and i < 3:  # Max 3 photos
-                    await asyncio.sleep(0.1)  # 100ms delay between requests
-        
-        # Get reviews (up to 3)
-        reviews = []
-        for review in details.get('reviews', [])[:3]:
-            if text := review.get('text'):
-                reviews.append(text.strip())
-        
-        # Get rating and total ratings
-        rating = details.get('rating')
-        if rating is not None:
-            try:
-                rating = float(rating)
-            except (TypeError, ValueError):
-                rating = None
-        
-        total_ratings = details.get('userRatingCount')
-        if total_ratings is not None:
-            try:
-                total_ratings = int(total_ratings)
-            except (TypeError, ValueError):
-                total_ratings = 0
+        # Photos and reviews (up to 3 each); review text is a LocalizedText object in Places v1
+        photos = [
+            f"{PLACES_BASE_URL}/{place_id}/photos/{p['name'].rsplit('/', 1)[-1]}/media?key={api_key}&maxWidthPx=600"
+            for p in (details.get('photos') or ())[:3] if p.get('name')
+        ]
+        # Latest three; ISO-8601 publishTime strings order correctly without parsing
+        latest = heapq.nlargest(3, details.get('reviews') or (), key=lambda r: r.get('publishTime') or '')
+        reviews = [text.strip() for r in latest if (text := _review_text(r))]
+        rating = _safe_float(details.get('rating'))
+        total_ratings = _safe_int(details.get('userRatingCount'))
         
         # Get address
         address = found.get('formattedAddress') or found.get('address', '')
@@ -398,7 +769,7 @@ async def place_details_async(query: str) -> dict:
         # Get opening hours if available
         opening_hours = found.get('regularOpeningHours', {})
         
-        return {
+        return _store_result(query, {
             'name': found.get('displayName', {}).get('text', query),
             'address': address,
             'rating': rating,
@@ -409,10 +780,18 @@ async def place_details_async(query: str) -> dict:
             'phone': phone,
             'opening_hours': opening_hours,
             'google_maps_url': found.get('googleMapsUri')
-        }
+        })
         
+    except httpx.HTTPStatusError as e:
+        # Report the upstream status as-is; the body goes to the log only, not into the LLM's context
+        status = e.response.status_code
+        logger.warning("Error in place_details_async: HTTP %s: %s", status, e.response.text[:512])
+        return {"error": f"HTTP {status}", "retryable": status in RETRYABLE_STATUS}
+    except CircuitOpenError:
+        # Distinct from "Place not found": the upstream is failing, not the query
+        return {"error": "Places API temporarily unavailable", "type": "circuit_open", "retryable": True}
     except Exception as e:
-        print(f"Error in place_details_async: {e}")
+        logger.warning("Error in place_details_async: %s", e)
         return {"error": f"Failed to fetch place details: {str(e)}"}
     finally:
         # Don't close the session here as it's managed by the application
@@ -425,20 +804,16 @@ def place_details(query: str) -> dict:
     Fetch place details via Google Places API (New).
     Returns: { rating, total_ratings, photos: [url...], reviews: [text...] }
     """
+    if query and (hit := _cached_result(query)) is not None:
+        return hit
+    if threading.current_thread() is _bg_thread:
+        # Blocking on .result() here would wait on the very loop that has to run the coroutine
+        raise RuntimeError("place_details is synchronous; await place_details_async from async code")
     try:
-        # Run the async function in the current event loop
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # If there's already a running event loop, create a new one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(place_details_async(query))
-            loop.close()
-            return result
-        else:
-            return loop.run_until_complete(place_details_async(query))
+        # Run on the dedicated background loop so the pooled session is reused across calls
+        return asyncio.run_coroutine_threadsafe(_place_details(query), _bg_loop).result()
     except Exception as e:
-        print(f"Error in place_details: {e}")
+        logger.warning("Error in place_details: %s", e)
         return {"error": f"Failed to fetch place details: {str(e)}"}
 
 # Update the tool registration to use the async version
@@ -446,108 +821,73 @@ mcp.tool(place_details_async, name="place_details_async")
 
 # Add a batch version of place details
 @mcp.tool
-async def batch_place_details(queries: List[str]) -> Dict[str, dict]:
+async def batch_place_details(queries: List[str], max_photos: int = 3) -> Dict[str, dict]:
     """
     Fetch details for multiple places concurrently.
+    `max_photos` caps the photo URLs returned per place (0-3).
     Returns: {query1: details1, query2: details2, ...}
     """
     if not queries:
         return {}
         
-    # Deduplicate queries while preserving order
-    unique_queries = []
-    seen = set()
+    # Deduplicate on the normalized form (the one cache keys use) while preserving order;
+    # the first spelling of each query is the one that gets looked up
+    canonical: Dict[str, str] = {}
     for q in queries:
-        if q and q not in seen:
-            seen.add(q)
-            unique_queries.append(q)
-    
-    # Process up to 10 queries at a time
-    results = {}
-    batch_size = 10
-    
-    for i in range(0, len(unique_queries), batch_size):
-        batch = unique_queries[i:i + batch_size]
-        tasks = [place_details_async(q) for q in batch]
-        batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Process results
-        for query, result in zip(batch, batch_results):
-            if isinstance(result, Exception):
-                print(f"Error processing {query}: {result}")
-                results[query] = {"error": str(result)}
-            else:
-                results[query] = result
-        
-        # Add a small delay between batches
-        if i + batch_size < len(unique_queries):
-            await asyncio.sleep(0.5)
+        if q:
+            canonical.setdefault(_norm(q), q)
+    if not canonical:
+        return {}
+    unique_queries = list(canonical.values())
     
-    return results
-                    time.sleep(0.1)
-        # Reviews (top 3 latest, text only)
-        def _parse_time(rv):
-            t = rv.get('publishTime')
-            if isinstance(t, str):
-                try:
-                    return datetime.fromisoformat(t.replace('Z', '+00:00'))
-                except Exception:
-                    return datetime.min
-            return datetime.min
-        revs = sorted(details.get('reviews') or [], key=_parse_time, reverse=True)[:2]
-        review_texts = [(rv.get('originalText') or {}).get('text') for rv in revs]
-
-        rating_val = details.get('rating')
-        total = details.get('userRatingCount')
-        rating_str = None
-        try:
-            if rating_val is not None and total is not None:
-                rating_str = f"{float(rating_val):.1f} ({int(total)})"
-        except Exception:
-            rating_str = None
-
-        return {
-            "rating": rating_val,
-            "total_ratings": total,
-            "rating_str": rating_str,
-            "photos": photos,
-            "reviews": [t for t in review_texts if t],
-        }
-    except requests.HTTPError as e:
-        try:
-            return {"error": f"HTTP {e.response.status_code}", "details": e.response.json()}
-        except Exception:
-            return {"error": str(e)}
-    except Exception as e:
-        return {"error": str(e)}
+    # Already-assembled responses need no further work
+    results = {q: hit for q in unique_queries if (hit := _cached_result(q)) is not None}
+    pending = [q for q in unique_queries if q not in results]
+
+    # Fetch every cached search result in one round-trip up front
+    cached = await mget_cache([_search_cache_key(q) for q in pending])
+    prefetched = {q: cached.get(_search_cache_key(q)) for q in pending}
+
+    # Drain a shared queue with a fixed pool of workers so a slow query
+    # never holds back the ones queued behind it
+    work: asyncio.Queue = asyncio.Queue()
+    workers = min(CONCURRENT_REQUESTS, len(pending))
+    for q in pending:
+        work.put_nowait(q)
+    for _ in range(workers):
+        work.put_nowait(None)
+
+    async def _worker():
+        while (query := await work.get()) is not None:
+            try:
+                results[query] = await _place_details(query, prefetched[query])
+            except Exception as e:
+                logger.warning("Error processing %s: %s", query, e)
+                results[query] = {"error": str(e)}
 
-    # Attempt to add a compact weather summary (if API key and address available)
-    try:
-        api_key = os.getenv('GOOGLE_MAPS_API_KEY')
-        addr = (found.get('formattedAddress') or found.get('displayName') or query)
-        if api_key and addr:
-            geo = _geocode_address(addr, api_key)
-            if geo:
-                weather = _fetch_weather_summary(geo['lat'], geo['lng'], days=3, api_key=api_key)
-                if weather:
-                    # attach under 'weather'
-                    return {**{
-                        "rating": rating_val,
-                        "total_ratings": total,
-                        "rating_str": rating_str,
-                        "photos": photos,
-                        "reviews": [t for t in review_texts if t],
-                    }, "weather": weather}
-    except Exception:
-        pass
+    await asyncio.gather(*(_worker() for _ in range(workers)))
 
-    return {
-        "rating": rating_val,
-        "total_ratings": total,
-        "rating_str": rating_str,
-        "photos": photos,
-        "reviews": [t for t in review_texts if t],
-    }
+    # Preserve the caller's query order and spellings
+    return {q: _limit_photos(results[canonical[_norm(q)]], max_photos) for q in queries if q}
+
+@mcp.tool
+async def get_weather(place: str, days: int = 3) -> dict:
+    """
+    Daily weather summary for a place over the next `days` days.
+    Returns: {date: {summary, avg_temp, temp_min, temp_max}, ...}
+    """
+    if not GOOGLE_MAPS_API_KEY:
+        return {"error": "GOOGLE_MAPS_API_KEY not configured"}
+    # A place already looked up via Places carries its coordinates; geocode only otherwise
+    found = await get_cache(_search_cache_key(place)) if place else None
+    loc = found.get('location') if isinstance(found, dict) else None
+    if loc and 'latitude' in loc and 'longitude' in loc:
+        geo = {'lat': loc['latitude'], 'lng': loc['longitude']}
+    else:
+        geo = await _geocode_address_async(place, GOOGLE_MAPS_API_KEY, await get_session())
+    if not geo:
+        return {"error": "Place not found"}
+    return await _fetch_weather_summary_async(geo['lat'], geo['lng'], days=days, session=await get_session())
 
 # NOTE: The previous Routes / compute_route tool has been removed per project decision.
 # The LLM prompts should now request the model to consider travel times and produce a
@@ -555,6 +895,24 @@ async def batch_place_details(queries: List[str]) -> Dict[str, dict]:
 # separate, well-specified tool here.
 
 if __name__ == "__main__":
+    # uvloop's faster event loop for the server when available; the stock loop otherwise
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
+    # Handlers only enqueue records; a listener thread does the stderr writes, so a slow
+    # log consumer never stalls the event loop
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), handlers=[QueueHandler(log_queue)])
+    log_listener = QueueListener(log_queue, logging.StreamHandler())
+    log_listener.start()
+    logger.info("Cache backend: %s", "redis (with in-process L1)" if REDIS_URL else "in-memory")
+
     # Cloud Run: listen on 0.0.0.0 and PORT (default 8080)
     port = int(os.getenv("PORT", "8080"))
-    mcp.run(transport="http", host="0.0.0.0", port=port)
+    try:
+        asyncio.run(_serve(transport="http", host="0.0.0.0", port=port))
+    finally:
+        log_listener.stop()
@@ -1,7 +1,13 @@
 from google.cloud import firestore
+import copy
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 try:
     # Python 3.9+ standard library
     from zoneinfo import ZoneInfo  # type: ignore
@@ -10,23 +16,149 @@ except Exception:  # pragma: no cover
 from google.api_core.exceptions import FailedPrecondition
 from google.cloud.firestore_v1 import FieldFilter
 
+# Loaded here too, so TIMEZONE from .env is visible when the module constants below are read
+load_dotenv()
+# Local timezone that depart_date days are interpreted in
+_TZ_NAME = os.getenv("TIMEZONE", "Asia/Kolkata")
+# Read the alternate travel schema alongside the primary instead of only after a primary miss:
+# faster misses, but every cold travel lookup bills both reads
+_PARALLEL_SCHEMAS = os.getenv("FS_TRAVEL_PARALLEL_SCHEMAS", "false").lower() == "true"
+
+@lru_cache(maxsize=8)
+def _tz(name: str):
+    """ZoneInfo for name; UTC when zoneinfo is unavailable or the name is unknown."""
+    if ZoneInfo is None:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        return timezone.utc
+
+def _day_window_utc(depart_date: str):
+    """
+    UTC bounds [start, end) of the local day named by a YYYY-MM-DD depart_date.
+    Returns (None, None) when depart_date is not a date string.
+    """
+    try:
+        day = datetime.fromisoformat(depart_date).date()
+    except (TypeError, ValueError):
+        return None, None
+    start_local = datetime(day.year, day.month, day.day, tzinfo=_tz(_TZ_NAME))
+    end_local = start_local + timedelta(days=1)
+    return start_local.astimezone(timezone.utc), end_local.astimezone(timezone.utc)
+
+# One Firestore client (gRPC channel, credentials, ADC discovery) per process, created on first use
+_DB = None
+_DB_LOCK = threading.Lock()
+
+def _get_db():
+    global _DB
+    if _DB is None:
+        with _DB_LOCK:
+            if _DB is None:
+                _DB = firestore.Client()
+    return _DB
+
+# Slugs keep letters/digits, turn runs of spaces, hyphens and underscores into one '-', and drop the rest
+_SLUG_DROP_RE = re.compile(r"[^\w \-]")
+_SLUG_SEP_RE = re.compile(r"[ _\-]+")
+
+@lru_cache(maxsize=256)
+def _slugify(text: str) -> str:
+    """Simple slugify to create Firestore-safe document IDs."""
+    if not text:
+        return "unknown"
+    slug = _SLUG_SEP_RE.sub("-", _SLUG_DROP_RE.sub("", text.lower()))
+    return slug.strip("-") or "unknown"
+
+def _fetch_all(query) -> list:
+    return [d.to_dict() for d in query.stream()]
+
+def _scan_pages(query, page: int = 20, cap: int = 200):
+    """Yield lists of document snapshots from query, page by page in document-id order, up to cap documents."""
+    ordered = query.order_by("__name__").limit(page)
+    cursor = None
+    scanned = 0
+    while scanned < cap:
+        snaps = list((ordered if cursor is None else ordered.start_after(cursor)).stream())
+        if snaps:
+            yield snaps
+        if len(snaps) < page:
+            return
+        scanned += len(snaps)
+        cursor = snaps[-1]
+
 class FirestoreClient:
-    def __init__(self, credentials_path: str = None):
+    # Recent reads, shared by every instance (the MCP server keeps a small pool of clients).
+    # Keys hold the exact query arguments, since Firestore equality filters are case-sensitive.
+    _cache = TTLCache(maxsize=1024, ttl=int(os.getenv("FS_CACHE_TTL", "300")))
+    _cache_lock = threading.RLock()
+    # Runs the alternate travel schema alongside the primary when FS_TRAVEL_PARALLEL_SCHEMAS=true;
+    # gRPC streaming releases the GIL
+    _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="firestore-query")
+
+    def __init__(self, credentials_path: str = None, dedicated: bool = False):
         """
         Initialize Firestore client.
         If credentials_path is None, defaults to GOOGLE_APPLICATION_CREDENTIALS env variable.
+        Instances share one process-wide firestore.Client unless dedicated=True (or an explicit
+        credentials_path is given), which opens a separate client with its own gRPC channel.
         """
-        load_dotenv()
         if credentials_path:
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-        self.db = firestore.Client()
+            self.db = firestore.Client.from_service_account_json(credentials_path)
+        elif dedicated:
+            self.db = firestore.Client()
+        else:
+            self.db = _get_db()
+
+    def _cached(self, key: tuple):
+        # Entries are stored as tuples and handed out as deep copies, so a caller that edits
+        # the returned documents can't change what the next caller sees
+        with self._cache_lock:
+            hit = self._cache.get(key)
+        return None if hit is None else copy.deepcopy(list(hit))
+
+    def _remember(self, key: tuple, value: list) -> list:
+        with self._cache_lock:
+            self._cache[key] = tuple(copy.deepcopy(value))
+        return value
+
+    def invalidate(self, kind: str = None):
+        """
+        Drop cached reads so the next call goes to Firestore.
+        kind: 'travel' or 'accommodation' to clear one collection only; None clears everything.
+        """
+        with self._cache_lock:
+            if kind is None:
+                self._cache.clear()
+                return
+            for key in [k for k in self._cache if k[0] == kind]:
+                self._cache.pop(key, None)
+
+    def _first_nonempty(self, primary, alternate) -> list:
+        """
+        Return primary's documents, or alternate()'s when primary has none.
+        Errors from primary (e.g. FailedPrecondition) propagate.
+        """
+        return _fetch_all(primary) or alternate()
 
     def get_travel_options(self, from_city: str, to_city: str, depart_date: str):
         """
         Fetch travel options from Firestore using flexible field names.
         Tries both (from,to) and (departure,destination). Applies same-day window if depart_date provided.
         If nothing is found, returns realistic Chennai<->Pondicherry samples.
+        Results are cached in-process for FS_CACHE_TTL seconds (default 300), unless a query
+        failed along the way.
         """
+        key = ("travel", from_city, to_city, depart_date or "")
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        results, degraded = self._query_travel_options(from_city, to_city, depart_date)
+        return results if degraded else self._remember(key, results)
+
+    def _query_travel_options(self, from_city: str, to_city: str, depart_date: str):
+        """Returns (results, degraded); degraded is True when a Firestore error was swallowed."""
         coll = self.db.collection("travel-collection")
         # Try primary schema: from/to
         base = (
@@ -39,83 +171,54 @@ class FirestoreClient:
                 .where(filter=FieldFilter("destination", "==", to_city))
         )
         query = base
-        # If depart_date is provided as a date string (YYYY-MM-DD), perform a same-day range query
-        # in the desired local timezone (defaults to Asia/Kolkata), then convert to UTC for querying.
-        if depart_date:
-            try:
-                # Parse as YYYY-MM-DD
-                day = datetime.fromisoformat(depart_date).date()
-                tz_name = os.getenv("TIMEZONE", "Asia/Kolkata")
-                if ZoneInfo is not None:
-                    local_tz = ZoneInfo(tz_name)
-                    start_local = datetime(day.year, day.month, day.day, 0, 0, 0, tzinfo=local_tz)
-                else:
-                    # Fallback: assume UTC if zoneinfo unavailable
-                    start_local = datetime(day.year, day.month, day.day, 0, 0, 0, tzinfo=timezone.utc)
-                end_local = start_local + timedelta(days=1)
-                # Convert to UTC for Firestore timestamp comparisons
-                start_utc = start_local.astimezone(timezone.utc)
-                end_utc = end_local.astimezone(timezone.utc)
-                query = (
-                    query
-                    .where(filter=FieldFilter("depart_date", ">=", start_utc))
-                    .where(filter=FieldFilter("depart_date", "<", end_utc))
-                )
-            except ValueError:
-                # If the provided value isn't a simple date string, fall back to equality and hope types match
-                query = query.where("depart_date", "==", depart_date)
+        # A YYYY-MM-DD depart_date becomes a same-day range in the local timezone (TIMEZONE,
+        # default Asia/Kolkata), expressed in UTC for Firestore timestamp comparisons
+        start_utc, end_utc = _day_window_utc(depart_date) if depart_date else (None, None)
+        if start_utc is not None:
+            query = (
+                query
+                .where(filter=FieldFilter("depart_date", ">=", start_utc))
+                .where(filter=FieldFilter("depart_date", "<", end_utc))
+            )
+        elif depart_date:
+            # If the provided value isn't a simple date string, fall back to equality and hope types match
+            query = query.where("depart_date", "==", depart_date)
+        degraded = False
+        # The alternate schema is read at most once per lookup, and only when a primary query
+        # comes back empty, unless FS_TRAVEL_PARALLEL_SCHEMAS starts it up front
+        alt_future = self._executor.submit(_fetch_all, alt) if _PARALLEL_SCHEMAS else None
+        @lru_cache(maxsize=None)
+        def _alternate() -> list:
+            return alt_future.result() if alt_future is not None else _fetch_all(alt)
         try:
-            docs = list(query.stream())
-            results = [doc.to_dict() for doc in docs]
-            if not results:
-                docs2 = list(alt.stream())
-                results = [doc.to_dict() for doc in docs2]
+            results = self._first_nonempty(query, _alternate)
             if results:
-                return results
+                return results, degraded
         except FailedPrecondition:
             # Missing composite index (from, to, depart_date range). Fallback: query by from/to,
             # then filter client-side by date window to avoid requiring an index.
             try:
-                docs = list(base.stream())
-                results = [d.to_dict() for d in docs]
-                if not results:
-                    docs2 = list(alt.stream())
-                    results = [d.to_dict() for d in docs2]
-            except Exception:
-                results = []
-            if not depart_date:
-                return results
-            try:
-                day = datetime.fromisoformat(depart_date).date()
-                tz_name = os.getenv("TIMEZONE", "Asia/Kolkata")
-                if ZoneInfo is not None:
-                    local_tz = ZoneInfo(tz_name)
-                else:
-                    local_tz = timezone.utc
-                start_local = datetime(day.year, day.month, day.day, 0, 0, 0, tzinfo=local_tz)
-                end_local = start_local + timedelta(days=1)
-                start_utc = start_local.astimezone(timezone.utc)
-                end_utc = end_local.astimezone(timezone.utc)
+                results = self._first_nonempty(base, _alternate)
             except Exception:
-                # If date parsing fails, return unfiltered results
-                return results
-            # Filter client-side by UTC window
-            filtered = []
-            for item in results:
-                ts = item.get("depart_date")
-                if isinstance(ts, datetime):
-                    # Ensure tz-aware UTC for comparison
-                    if ts.tzinfo is None:
-                        ts = ts.replace(tzinfo=timezone.utc)
-                    else:
-                        ts = ts.astimezone(timezone.utc)
-                    if start_utc <= ts < end_utc:
-                        filtered.append(item)
-                else:
-                    # If not a datetime (unexpected), keep item only when no date provided
-                    pass
+                results, degraded = [], True
+            if start_utc is None:
+                # No date, or not a parseable one: return unfiltered results
+                return results, degraded
+            # Filter client-side by UTC window. Aware timestamps compare correctly across zones,
+            # so only naive ones (taken as UTC) need a tzinfo; non-datetimes never match.
+            utc = timezone.utc
+            def _in_window(ts) -> bool:
+                if not isinstance(ts, datetime):
+                    return False
+                if ts.tzinfo is None:
+                    ts = ts.replace(tzinfo=utc)
+                return start_utc <= ts < end_utc
+            filtered = [item for item in results if _in_window(item.get("depart_date"))]
             if filtered:
-                return filtered
+                return filtered, degraded
+        finally:
+            if alt_future is not None:
+                alt_future.cancel()
 
         # If still empty, provide realistic Chennai<->Pondicherry samples as a safe fallback
         def _iso_to_dt(date_str: str):
@@ -150,49 +253,55 @@ class FirestoreClient:
                 _mk("bus-tnstc-0830", "BUS", "TNSTC AC", 8, 30, 240, 650),
                 _mk("train-umi-1015", "TRAIN", "UMI Express", 10, 15, 210, 180),
             ]
-            return samples
+            return samples, degraded
 
-        return []
+        return [], degraded
 
     def get_accommodation(self, city: str):
         """
         Fetch accommodation options from Firestore. Prefer 'city' field, otherwise
         fallback to scanning documents where destination==city or any hotel address contains the city name.
         If nothing found for Pondicherry, return a realistic sample list similar to your template.
+        Results are cached in-process for FS_CACHE_TTL seconds (default 300), unless a query
+        failed along the way.
         """
+        key = ("accommodation", city or "")
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        results, degraded = self._query_accommodation(city or "")
+        return results if degraded else self._remember(key, results)
+
+    def _query_accommodation(self, city: str):
+        """Returns (results, degraded); degraded is True when a Firestore error was swallowed."""
         coll = self.db.collection("accommodation-collection")
-        city = city or ""
+        degraded = False
         try:
             docs = list(coll.where(filter=FieldFilter("city", "==", city)).stream())
             results = [d.to_dict() for d in docs]
             if results:
-                return results
-        except FailedPrecondition:
-            results = []
+                return results, degraded
         except Exception:
-            results = []
+            degraded = True
 
-        # Fallback: scan limited number of docs and filter
+        lc = city.strip().lower()
+        # Fallback: scan a page at a time and stop after the first page with matches,
+        # so an early hit doesn't pay for the rest of the scan
+        def _matches(obj: dict) -> bool:
+            dest = str(obj.get("destination") or obj.get("city") or "").strip().lower()
+            if dest == lc:
+                return True
+            return bool(lc) and any(
+                lc in str((h or {}).get("address") or "").strip().lower()
+                for h in obj.get("hotels") or []
+            )
         try:
-            docs_all = list(coll.limit(50).stream())
-            filtered = []
-            lc = city.strip().lower()
-            for d in docs_all:
-                obj = d.to_dict()
-                dest = str(obj.get("destination") or obj.get("city") or "").strip().lower()
-                if dest == lc:
-                    filtered.append(obj)
-                    continue
-                hotels = obj.get("hotels") or []
-                for h in hotels:
-                    addr = str((h or {}).get("address") or "").strip().lower()
-                    if lc and lc in addr:
-                        filtered.append(obj)
-                        break
-            if filtered:
-                return filtered
+            for snaps in _scan_pages(coll):
+                filtered = [obj for obj in (d.to_dict() for d in snaps) if _matches(obj)]
+                if filtered:
+                    return filtered, degraded
         except Exception:
-            pass
+            degraded = True
 
         # Realistic fallback for Pondicherry
         if city.strip().lower() in ("pondicherry", "puducherry"):
@@ -256,24 +365,35 @@ class FirestoreClient:
                     },
                 ],
             }
-            return [sample]
+            return [sample], degraded
 
-        return []
+        return [], degraded
 
-    def _slugify(self, text: str) -> str:
-        """Simple slugify to create Firestore-safe document IDs."""
-        if not text:
-            return "unknown"
-        allowed = []
-        for ch in text.lower():
-            if ch.isalnum():
-                allowed.append(ch)
-            elif ch in [' ', '-', '_']:
-                allowed.append('-')
-        slug = ''.join(allowed)
-        while '--' in slug:
-            slug = slug.replace('--', '-')
-        return slug.strip('-') or "unknown"
+    def get_accommodation_many(self, cities: list):
+        """
+        Fetch accommodation for several cities with 'city in [...]' queries (30 values per query).
+        Cities with no direct match go through get_accommodation's scan/sample fallbacks.
+        Returns {city: [docs...]} in the order the cities were given.
+        """
+        unique = [c for c in dict.fromkeys(cities or []) if c]
+        cached = {c: hit for c in unique if (hit := self._cached(("accommodation", c))) is not None}
+        missing = [c for c in unique if c not in cached]
+        found = {c: [] for c in missing}
+        coll = self.db.collection("accommodation-collection")
+        for i in range(0, len(missing), 30):
+            chunk = missing[i:i + 30]
+            try:
+                for d in coll.where(filter=FieldFilter("city", "in", chunk)).stream():
+                    obj = d.to_dict()
+                    if obj.get("city") in found:
+                        found[obj["city"]].append(obj)
+            except Exception:
+                # Drop any partial matches; these cities retry through get_accommodation
+                for c in chunk:
+                    found[c] = []
+        for c in missing:
+            cached[c] = self._remember(("accommodation", c), found[c]) if found[c] else self.get_accommodation(c)
+        return {c: cached[c] for c in unique}
 
     def save_generated_plan(self, destination: str, plan_json: dict) -> str:
         """
@@ -282,7 +402,7 @@ class FirestoreClient:
         Returns the document ID.
         """
         ts = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-        dest_slug = self._slugify(destination or 'unknown')
+        dest_slug = _slugify(destination or 'unknown')
         doc_id = f"{dest_slug}-travel-plan-{ts}"
         doc_ref = self.db.collection("generated-plan").document(doc_id)
         # Store ONLY the plan JSON at the root of the document, per requirement
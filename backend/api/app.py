@@ -17,7 +17,7 @@ from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, field_validator, model_validator
 from starlette.middleware.base import BaseHTTPMiddleware
 
 # Configure OpenTelemetry
@@ -65,6 +65,7 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 from services.generate_travel_stay import generate_travel_and_stay
 from services.generate_itinerary_from_selections import generate_itinerary_from_selections
 from services.generate_end_to_end_itinerary import generate_end_to_end_itinerary
+from services.common import close_http_client
 
 def _normalize_bool(v):
     if isinstance(v, bool):
@@ -73,43 +74,68 @@ def _normalize_bool(v):
         return v.strip().lower() in {"1", "true", "yes", "y"}
     return bool(v)
 
-def _normalize_prefs(d: Dict[str, Any]) -> Dict[str, Any]:
-    """Make incoming user preferences tolerant to alias keys and missing fields.
-    Maps common aliases to the canonical keys expected by services.
-    """
-    if not isinstance(d, dict):
-        return {}
-    out: Dict[str, Any] = dict(d)
+class UserPrefsIn(BaseModel):
+    """Canonical user-preference fields; each accepts the alias keys clients commonly send."""
+    model_config = ConfigDict(extra="ignore")
+
     # Aliases for city fields
-    out.setdefault("departure", d.get("from") or d.get("fromCity") or d.get("source") or d.get("origin"))
-    out.setdefault("destination", d.get("to") or d.get("toCity") or d.get("city") or d.get("destinationCity"))
+    departure: Any = Field(None, validation_alias=AliasChoices("departure", "from", "fromCity", "source", "origin"))
+    destination: Any = Field(None, validation_alias=AliasChoices("destination", "to", "toCity", "city", "destinationCity"))
     # Date aliases
-    out.setdefault("startDate", d.get("start_date") or d.get("fromDate") or d.get("start"))
-    out.setdefault("endDate", d.get("end_date") or d.get("toDate") or d.get("end"))
+    startDate: Any = Field(None, validation_alias=AliasChoices("startDate", "start_date", "fromDate", "start"))
+    endDate: Any = Field(None, validation_alias=AliasChoices("endDate", "end_date", "toDate", "end"))
     # Theme/notes aliases
-    out.setdefault("tripTheme", d.get("theme") or d.get("trip_type") or d.get("tripTheme"))
-    out.setdefault("specialInstructions", d.get("notes") or d.get("instructions") or d.get("specialNotes"))
+    tripTheme: Any = Field(None, validation_alias=AliasChoices("tripTheme", "theme", "trip_type"))
+    specialInstructions: Any = Field(None, validation_alias=AliasChoices("specialInstructions", "notes", "instructions", "specialNotes"))
     # Activities alias
-    if "activities" not in out:
-        acts = d.get("interests") or d.get("activity")
-        if isinstance(acts, str):
-            out["activities"] = [acts]
-        elif isinstance(acts, list):
-            out["activities"] = acts
-    # Members normalization
-    members = out.get("members")
-    if not isinstance(members, dict):
-        members = {
-            "adults": d.get("adults") or d.get("adultCount") or 0,
-            "children": d.get("children") or d.get("childCount") or 0,
+    activities: Optional[List[Any]] = Field(None, validation_alias=AliasChoices("activities", "interests", "activity"))
+    members: Dict[str, Any]
+
+    @field_validator("activities", mode="before")
+    @classmethod
+    def _activities_list(cls, v):
+        if isinstance(v, str):
+            return [v]
+        return v if isinstance(v, list) else None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _skip_empty_aliases(cls, data):
+        # An empty alias falls through to the next one, as the old `a or b or ...` lookups did;
+        # the canonical key itself is kept even when empty
+        if not isinstance(data, dict):
+            return data
+        empty = {
+            alias
+            for name, f in cls.model_fields.items() if isinstance(f.validation_alias, AliasChoices)
+            for alias in f.validation_alias.choices if alias != name and not data.get(alias)
         }
-    else:
+        return {k: v for k, v in data.items() if k not in empty} if empty else data
+
+    @model_validator(mode="before")
+    @classmethod
+    def _members(cls, data):
+        # Members normalization: nested object or top-level counts
+        if not isinstance(data, dict):
+            return data
+        src = data.get("members") if isinstance(data.get("members"), dict) else data
         members = {
-            "adults": members.get("adults") or members.get("adultCount") or 0,
-            "children": members.get("children") or members.get("childCount") or 0,
+            "adults": src.get("adults") or src.get("adultCount") or 0,
+            "children": src.get("children") or src.get("childCount") or 0,
         }
-    out["members"] = members
-    return out
+        return {**data, "members": members}
+
+def _normalize_prefs(d: Dict[str, Any]) -> Dict[str, Any]:
+    """Make incoming user preferences tolerant to alias keys and missing fields.
+    Maps common aliases to the canonical keys expected by services; other keys pass through.
+    """
+    if not isinstance(d, dict):
+        return {}
+    prefs = UserPrefsIn.model_validate(d).model_dump()
+    if prefs["activities"] is None:
+        # Leave activities absent (or as given) when nothing list-like was provided
+        del prefs["activities"]
+    return {**d, **prefs}
 
 def _normalize_selections(sel: Dict[str, Any]) -> Dict[str, Any]:
     """Normalize selections payload: ensure expected keys exist and coerce simple types."""
@@ -145,6 +171,7 @@ async def lifespan(app: FastAPI):
     finally:
         # Cleanup
         logger.info("Shutting down DynoTrip API...")
+        await close_http_client()
 
 # Initialize FastAPI with optimized settings
 app = FastAPI(
@@ -196,6 +223,35 @@ async def add_process_time_header(request: Request, call_next):
 class Payload(BaseModel):
     payload: Dict[str, Any]
 
+# Request bodies: pydantic checks that each shape's objects are dicts; the endpoints pick the shape
+_PREF_KEYS = {"departure", "destination", "startDate", "endDate", "members", "activities", "tripTheme", "budget", "specialInstructions"}
+
+class TravelStayBody(BaseModel):
+    """{inputJson}, {userPref}, or flat preference fields (kept as extras)."""
+    model_config = ConfigDict(extra="allow")
+
+    inputJson: Optional[Dict[str, Any]] = None
+    userPref: Optional[Dict[str, Any]] = None
+
+    def preferences(self) -> Optional[Dict[str, Any]]:
+        if self.inputJson is not None:
+            return self.inputJson
+        if self.userPref is not None:
+            return self.userPref
+        flat = self.model_extra or {}
+        return flat if _PREF_KEYS.intersection(flat) else None
+
+class SelectionsBody(BaseModel):
+    """{inputJson} with nested selections, or {userPref, selections}."""
+    inputJson: Optional[Dict[str, Any]] = None
+    userPref: Optional[Dict[str, Any]] = None
+    selections: Optional[Dict[str, Any]] = None
+
+class ItineraryBody(BaseModel):
+    """{generatedPlan} or {inputJson: {generatedPlan}}."""
+    generatedPlan: Optional[Dict[str, Any]] = None
+    inputJson: Optional[Dict[str, Any]] = None
+
 @app.get("/")
 async def root():
     return {
@@ -261,27 +317,16 @@ async def health() -> Dict[str, Any]:
     return system_info
 
 @app.post("/travel-stay")
-async def travel_stay_endpoint(body: Dict[str, Any]):
+async def travel_stay_endpoint(body: TravelStayBody):
     try:
         # Accept flexible shapes:
         # 1) { "inputJson": { ...user preferences... } }  (back-compat)
         # 2) { "userPref": { ... } }
         # 3) { departure, destination, startDate, endDate, ... } (flat)
-        data = None
-        if isinstance(body, dict):
-            if isinstance(body.get("inputJson"), dict):
-                data = body["inputJson"]
-            elif isinstance(body.get("userPref"), dict):
-                data = body["userPref"]
-            else:
-                # If flat fields are present, treat the whole body as preferences
-                keys = {"departure", "destination", "startDate", "endDate", "members", "activities", "tripTheme", "budget", "specialInstructions"}
-                if any(k in body for k in keys):
-                    data = body
-        if isinstance(data, dict):
-            data = _normalize_prefs(data)
-        else:
+        data = body.preferences()
+        if data is None:
             raise HTTPException(status_code=400, detail="Body must contain inputJson, userPref, or flat preference fields")
+        data = _normalize_prefs(data)
         result = await generate_travel_and_stay(data)
         return result
     except HTTPException:
@@ -292,27 +337,21 @@ async def travel_stay_endpoint(body: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=msg)
 
 @app.post("/itinerary-from-selections")
-async def itinerary_from_selections_endpoint(body: Dict[str, Any]):
+async def itinerary_from_selections_endpoint(body: SelectionsBody):
     try:
         # Accept either of the following shapes:
         # 1) { "inputJson": { ...combined preferences + selections... } }
         # 2) { "userPref": { ... }, "selections": { ... } }
-        data: Dict[str, Any] | None = None
-        if isinstance(body, dict):
-            if isinstance(body.get("inputJson"), dict):
-                data = _normalize_prefs(body["inputJson"]) if isinstance(body["inputJson"], dict) else None
-                # If nested selections provided inside inputJson, normalize them
-                if isinstance(data, dict) and isinstance(body["inputJson"].get("selections"), dict):
-                    data["selections"] = _normalize_selections(body["inputJson"]["selections"])
-            else:
-                user_pref = body.get("userPref")
-                selections = body.get("selections")
-                if isinstance(user_pref, dict) and isinstance(selections, dict):
-                    # Merge user preferences at top-level and embed selections under 'selections'
-                    merged = _normalize_prefs(user_pref)
-                    merged["selections"] = _normalize_selections(selections)
-                    data = merged
-        if not isinstance(data, dict):
+        if body.inputJson is not None:
+            data = _normalize_prefs(body.inputJson)
+            # If nested selections provided inside inputJson, normalize them
+            if isinstance(body.inputJson.get("selections"), dict):
+                data["selections"] = _normalize_selections(body.inputJson["selections"])
+        elif body.userPref is not None and body.selections is not None:
+            # Merge user preferences at top-level and embed selections under 'selections'
+            data = _normalize_prefs(body.userPref)
+            data["selections"] = _normalize_selections(body.selections)
+        else:
             raise HTTPException(status_code=400, detail="Body must contain inputJson object as per template or userPref + selections")
         result = await generate_itinerary_from_selections(data)
         return result
@@ -329,18 +368,16 @@ async def itinerary_from_selections_endpoint(body: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=msg)
 
 @app.post("/itinerary")
-async def itinerary_endpoint(body: Dict[str, Any]):
+async def itinerary_endpoint(body: ItineraryBody):
     try:
         # Accept flexible shapes:
         # 1) { "generatedPlan": { ... } }  (primary)
         # 2) { "inputJson": { "generatedPlan": { ... } } }  (back-compat)
-        data = None
-        if isinstance(body, dict):
-            if isinstance(body.get("generatedPlan"), dict):
-                data = body["generatedPlan"]
-            elif isinstance(body.get("inputJson"), dict) and isinstance(body["inputJson"].get("generatedPlan"), dict):
-                data = body["inputJson"]["generatedPlan"]
-        if not isinstance(data, dict):
+        if body.generatedPlan is not None:
+            data = body.generatedPlan
+        elif body.inputJson is not None and isinstance(body.inputJson.get("generatedPlan"), dict):
+            data = body.inputJson["generatedPlan"]
+        else:
             raise HTTPException(status_code=400, detail="Body must contain generatedPlan or inputJson.generatedPlan")
         result = await generate_end_to_end_itinerary(data)
         return result
@@ -1,5 +1,5 @@
 import os
-import json
+from collections import Counter
 from typing import Any, Dict, Optional
 from dotenv import load_dotenv
 from fastmcp import Client
@@ -10,7 +10,8 @@ except Exception:
     StreamableHttpTransport = None  # type: ignore
 
 from google import genai
-import requests
+import httpx
+import orjson
 from datetime import datetime, timedelta
 
 load_dotenv()
@@ -53,6 +54,24 @@ else:
         location=os.getenv("VERTEX_AI_LOCATION", "us-central1"),
     )
 
+# Shared HTTP client for the geocoding/weather helpers, so their calls reuse pooled connections
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _http_client
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 def read_file(path: str) -> str:
     try:
@@ -90,7 +109,7 @@ def parse_json_response(resp) -> Dict[str, Any]:
     # Try parsed schema first if available
     if getattr(resp, "parsed", None) is not None:
         try:
-            return json.loads(json.dumps(resp.parsed))
+            return orjson.loads(orjson.dumps(resp.parsed))
         except Exception:
             pass
     # Fallback: extract text and parse JSON object
@@ -104,12 +123,12 @@ def parse_json_response(resp) -> Dict[str, Any]:
     end = stripped.rfind('}')
     if start != -1 and end != -1 and end > start:
         try:
-            return json.loads(stripped[start:end+1])
+            return orjson.loads(stripped[start:end+1])
         except Exception as e:
             raise ValueError(f"LLM returned non-JSON or malformed JSON object: {str(e)} | Snippet: {stripped[:200]}")
     # As last resort, try direct json
     try:
-        return json.loads(stripped)
+        return orjson.loads(stripped)
     except Exception as e:
         raise ValueError(f"LLM returned non-JSON content: {str(e)} | Snippet: {stripped[:200]}")
 
@@ -136,10 +155,14 @@ def llm_json_with_tools(prompt: str, response_schema: Any = None, timeout: int =
             return parse_json_response(resp)
 
     import asyncio
-    return asyncio.get_event_loop().run_until_complete(asyncio.wait_for(_run(), timeout=timeout))
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(asyncio.wait_for(_run(), timeout=timeout))
+    raise RuntimeError("llm_json_with_tools is synchronous; from async code, await the Gemini client directly")
 
 
-def geocode_place(address: str, api_key: str | None = None) -> Optional[Dict[str, float]]:
+async def geocode_place(address: str, api_key: str | None = None) -> Optional[Dict[str, float]]:
     """Resolve a freeform address/place name to a (lat, lon) dict using Google Geocoding API.
     Returns {'lat': float, 'lng': float} or None on failure.
     """
@@ -149,9 +172,9 @@ def geocode_place(address: str, api_key: str | None = None) -> Optional[Dict[str
         return None
     try:
         url = "https://maps.googleapis.com/maps/api/geocode/json"
-        resp = requests.get(url, params={"address": address, "key": api_key}, timeout=8)
+        resp = await get_http_client().get(url, params={"address": address, "key": api_key}, timeout=httpx.Timeout(8.0, connect=3.0))
         resp.raise_for_status()
-        data = resp.json()
+        data = orjson.loads(resp.content)
         results = data.get('results') or []
         if not results:
             return None
@@ -163,7 +186,7 @@ def geocode_place(address: str, api_key: str | None = None) -> Optional[Dict[str
         return None
 
 
-def get_hourly_weather_summary(lat: float, lng: float, days: int = 3, api_key: str | None = None) -> Dict[str, Any]:
+async def get_hourly_weather_summary(lat: float, lng: float, days: int = 3, api_key: str | None = None) -> Dict[str, Any]:
     """Fetch a short daily weather summary for the next `days` days using the Google Weather Hours lookup.
     Returns a dict keyed by ISO date (YYYY-MM-DD) with simple summary strings like 'Rainy', 'Sunny'.
     This is intentionally simple: picks the most frequent condition label in the day's hours.
@@ -173,23 +196,6 @@ def get_hourly_weather_summary(lat: float, lng: float, days: int = 3, api_key: s
     if not api_key:
       return {}
 
-    # Helper: robust ISO parsing (accepts 'Z', fractional seconds, or missing timezone)
-    def _parse_ts(ts_val: Any) -> Optional[datetime]:
-      if not ts_val:
-        return None
-      s = str(ts_val)
-      try:
-        return datetime.fromisoformat(s.replace('Z', '+00:00'))
-      except Exception:
-        try:
-          # drop fractional seconds if present
-          base = s.split('.')[0]
-          if base.endswith('Z'):
-            base = base.replace('Z', '+00:00')
-          return datetime.fromisoformat(base)
-        except Exception:
-          return None
-
     summaries: Dict[str, Any] = {}
     try:
       url = "https://weather.googleapis.com/v1/forecast/hours:lookup"
@@ -200,9 +206,9 @@ def get_hourly_weather_summary(lat: float, lng: float, days: int = 3, api_key: s
         # Hint metric units where supported (harmless if ignored)
         "units": "metric",
       }
-      resp = requests.get(url, params=params, timeout=10)
+      resp = await get_http_client().get(url, params=params)
       resp.raise_for_status()
-      data = resp.json() or {}
+      data = orjson.loads(resp.content) or {}
 
       # Some responses might nest differently; prefer 'hours', else try alternative common keys
       hours = data.get('hours')
@@ -212,57 +218,51 @@ def get_hourly_weather_summary(lat: float, lng: float, days: int = 3, api_key: s
         if not isinstance(hours, list):
           hours = []
 
-      # Bucket hours by day for next N days starting from now (UTC)
-      buckets: Dict[str, list] = {}
-      now = datetime.utcnow()
+      # One pass over the hours, bucketed by day for the next N days starting from now (UTC).
+      # ISO timestamps begin with YYYY-MM-DD, so the day key is a slice rather than a datetime parse.
+      today = datetime.utcnow().date()
+      day_keys = [(today + timedelta(days=i)).isoformat() for i in range(max(1, int(days)))]
+      cond_counts: Dict[str, Counter] = {d: Counter() for d in day_keys}
+      temps: Dict[str, list] = {d: [] for d in day_keys}
+      hour_counts: Counter = Counter()
       for h in hours:
         ts = h.get('time') or h.get('startTime') or h.get('datetime')
-        dt = _parse_ts(ts)
-        if dt is None:
+        d = str(ts)[:10] if ts else None
+        if d not in cond_counts:
           continue
-        # Only include hours within the requested horizon
-        delta_days = (dt.date() - now.date()).days
-        if delta_days < 0 or delta_days >= max(1, int(days)):
-          continue
-        date_key = dt.date().isoformat()
-        buckets.setdefault(date_key, []).append(h)
+        hour_counts[d] += 1
+        cond_obj = h.get('condition') or {}
+        cond = (
+          cond_obj.get('text')
+          or cond_obj.get('code')
+          or h.get('weather_text')
+          or h.get('weatherCode')
+          or 'Unknown'
+        )
+        cond_counts[d][str(cond)] += 1
+        temp = (
+          h.get('temperature')
+          or h.get('temperatureC')
+          or h.get('temp_c')
+          or h.get('temperature_2m')
+        )
+        if temp is not None:
+          try:
+            temps[d].append(float(temp))
+          except Exception:
+            pass
 
-      # Build daily summaries
-      for i in range(max(1, int(days))):
-        d = (now + timedelta(days=i)).date().isoformat()
-        day_hours = buckets.get(d, [])
-        if not day_hours:
+      for d in day_keys:
+        if not hour_counts[d]:
           summaries[d] = {"summary": "Unknown", "avg_temp": None, "detail_count": 0}
           continue
-        cond_counts: Dict[str, int] = {}
-        temps: list = []
-        for h in day_hours:
-          cond_obj = h.get('condition') or {}
-          cond = (
-            cond_obj.get('text')
-            or cond_obj.get('code')
-            or h.get('weather_text')
-            or h.get('weatherCode')
-            or 'Unknown'
-          )
-          cond_counts[str(cond)] = cond_counts.get(str(cond), 0) + 1
-          temp = (
-            h.get('temperature')
-            or h.get('temperatureC')
-            or h.get('temp_c')
-            or h.get('temperature_2m')
-          )
-          if temp is not None:
-            try:
-              temps.append(float(temp))
-            except Exception:
-              pass
-        most = max(cond_counts.items(), key=lambda x: x[1])[0] if cond_counts else 'Unknown'
-        avg_temp = (sum(temps) / len(temps)) if temps else None
+        most = cond_counts[d].most_common(1)[0][0] if cond_counts[d] else 'Unknown'
+        day_temps = temps[d]
+        avg_temp = (sum(day_temps) / len(day_temps)) if day_temps else None
         summaries[d] = {
-          'summary': 'Unknown' if most is None else str(most),
+          'summary': most,
           'avg_temp': round(avg_temp, 1) if avg_temp is not None else None,
-          'detail_count': len(day_hours),
+          'detail_count': hour_counts[d],
         }
     except Exception:
       return {}
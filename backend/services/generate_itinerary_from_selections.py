@@ -1,3 +1,4 @@
+import asyncio
 import os
 import logging
 from typing import Any, Dict
@@ -35,48 +36,50 @@ async def generate_itinerary_from_selections(input_json: Dict[str, Any]) -> Dict
     # Try to fetch a concise weather summary for the trip destination/dates and include it in the prompt.
     parts = []
     parts.append("You are an AI itinerary planner.\n")
-    parts.append("Use ONLY this MCP tool: place_details(query). Do NOT call any other tools.\n")
+    parts.append("Use ONLY this MCP tool: batch_place_details(queries, max_photos=2). Do NOT call any other tools.\n")
+    parts.append("First decide every place you need, then call batch_place_details ONCE with all of them and max_photos=2; its result is keyed by query.\n")
     # Collect a small weather summary to provide context to the LLM (help it prefer indoor/outdoor activities).
-    weather_summary_text = ''
-    weather = {}  # Initialize before try block to ensure it's always in scope
-    try:
-        start = input_json.get('startDate')
-        end = input_json.get('endDate')
-        days = 3
-        if start and end:
-            try:
-                sd = datetime.fromisoformat(start).date()
-                ed = datetime.fromisoformat(end).date()
-                days = max(1, (ed - sd).days + 1)
-                logger.info(f"Trip duration: {days} days ({start} to {end})")
-            except Exception as e:
-                logger.warning(f"Failed to parse dates: {e}")
-                days = 3
-        dest = input_json.get('destination') or (input_json.get('selections') or {}).get('destination')
-        logger.info(f"Destination: {dest}")
+    async def _fetch_weather():
+        weather_summary_text = ''
+        weather = {}  # Initialize before try block to ensure it's always in scope
+        try:
+            start = input_json.get('startDate')
+            end = input_json.get('endDate')
+            days = 3
+            if start and end:
+                try:
+                    sd = datetime.fromisoformat(start).date()
+                    ed = datetime.fromisoformat(end).date()
+                    days = max(1, (ed - sd).days + 1)
+                    logger.info(f"Trip duration: {days} days ({start} to {end})")
+                except Exception as e:
+                    logger.warning(f"Failed to parse dates: {e}")
+                    days = 3
+            dest = input_json.get('destination') or (input_json.get('selections') or {}).get('destination')
+            logger.info(f"Destination: {dest}")
         
-        if dest:
-            geo = geocode_place(dest)
-            if geo:
-                logger.info(f"Geocoded {dest} to lat={geo['lat']}, lng={geo['lng']}")
-                weather = get_hourly_weather_summary(geo['lat'], geo['lng'], days=days)
-                if weather:
-                    summary_lines = [f"{d}: {v.get('summary')} (avg {v.get('avg_temp')}C)" for d, v in weather.items()]
-                    weather_summary_text = "\n".join(summary_lines)
-                    logger.info(f"Fetched weather for {len(weather)} days")
+            if dest:
+                geo = await geocode_place(dest)
+                if geo:
+                    logger.info(f"Geocoded {dest} to lat={geo['lat']}, lng={geo['lng']}")
+                    weather = await get_hourly_weather_summary(geo['lat'], geo['lng'], days=days)
+                    if weather:
+                        summary_lines = [f"{d}: {v.get('summary')} (avg {v.get('avg_temp')}C)" for d, v in weather.items()]
+                        weather_summary_text = "\n".join(summary_lines)
+                        logger.info(f"Fetched weather for {len(weather)} days")
+                    else:
+                        logger.warning("No weather data returned from API")
                 else:
-                    logger.warning("No weather data returned from API")
+                    logger.warning(f"Could not geocode destination: {dest}")
             else:
-                logger.warning(f"Could not geocode destination: {dest}")
-        else:
-            logger.warning("No destination found in input")
-    except Exception as e:
-        logger.error(f"Error fetching weather: {e}", exc_info=True)
+                logger.warning("No destination found in input")
+        except Exception as e:
+            logger.error(f"Error fetching weather: {e}", exc_info=True)
+        return weather, weather_summary_text
+
+    # Start the lookup now so it overlaps with opening the MCP session below
+    weather_task = asyncio.create_task(_fetch_weather())
     
-    if weather_summary_text:
-        parts.append("Weather summary for trip dates/destination (concise):\n" + weather_summary_text + "\n")
-    else:
-        logger.warning("No weather summary available for prompt")
     parts.append("Do NOT call any other tools.\n")
     parts.append("Input structure: top-level contains user preferences (departure, destination, startDate, endDate, members, activities, tripTheme, budget, specialInstructions).\n")
     parts.append("Input also contains selections under 'selections' with chosen travel and accommodation.\n")
@@ -90,19 +93,25 @@ async def generate_itinerary_from_selections(input_json: Dict[str, Any]) -> Dict
     parts.append("- Each day's order should be route-aware: consider realistic travel times between places and produce an order that minimizes travel time and is feasible for the day.\n")
     parts.append("- For main itinerary items: include up to 2 photos, 1-sentence description (<=20 words), and 1–2 short review lines.\n")
     parts.append("- For each itinerary item (generatedPlan.storyItinerary[].items[]), include a 'weather' object with keys: date (YYYY-MM-DD), summary (short word like Rainy/Sunny/Cloudy), and avg_temp (C or null).\n")
-    parts.append("- For suggestedPlaces and hiddenGems: exactly 1 photo, exactly 1 short review, and rating if available via place_details.\n")
+    parts.append("- For suggestedPlaces and hiddenGems: exactly 1 photo, exactly 1 short review, and rating if available via batch_place_details.\n")
     parts.append("- Limit suggestedPlaces to at most 3 and hiddenGems to at most 2.\n")
-    parts.append("- Limit total place_details calls to at most 5 across the plan to optimize performance.\n")
+    parts.append("- Look up at most 5 places in total across the plan, all in that single batch_place_details call.\n")
     parts.append("- Consider any provided travel and accommodation context from input when building feasible day plans.\n")
     parts.append("- Base Day 1 timing on the selected outbound arrival window when possible; keep schedule realistic relative to check-in.\n")
     parts.append("Output MUST strictly match this JSON template (keys and types):\n")
     parts.append("Template: " + template_json + "\n")
-    parts.append("Input: " + str(input_json) + "\n")
 
-    # Capture weather for async closure
-    weather_map = weather if isinstance(weather, dict) else {}
-    async def _run(weather_map=weather_map):
+    async def _run():
         async with mcp_client:
+            weather, weather_summary_text = await weather_task
+            weather_map = weather if isinstance(weather, dict) else {}
+            # Per-request content goes last so the static instructions above form a stable
+            # prefix that Gemini's implicit context cache can reuse across requests.
+            if weather_summary_text:
+                parts.append("Weather summary for trip dates/destination (concise):\n" + weather_summary_text + "\n")
+            else:
+                logger.warning("No weather summary available for prompt")
+            parts.append("Input: " + str(input_json) + "\n")
             cfg = genai.types.GenerateContentConfig(
                 tools=[mcp_client.session],
             )
@@ -179,4 +188,10 @@ async def generate_itinerary_from_selections(input_json: Dict[str, Any]) -> Dict
 
             return parsed
 
-    return await _run()
+    try:
+        return await _run()
+    finally:
+        # Only awaited inside the MCP session; if connecting or generation failed first,
+        # stop the lookup rather than leave it running unobserved
+        if not weather_task.done():
+            weather_task.cancel()
@@ -11,12 +11,18 @@ TEMPLATE_PATH = os.path.join(
     "stay_travel.json",
 )
 
+# Cache template to avoid reading file on every request
+_TEMPLATE_CACHE = None
+
 async def generate_travel_and_stay(user_input: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate travel and accommodation JSON using ONLY MCP Firestore tools.
     Expects `user_input` with keys matching templates/input_jsons/input_user_pref.json (inputJson).
     """
-    template_json = read_file(TEMPLATE_PATH)
+    global _TEMPLATE_CACHE
+    if _TEMPLATE_CACHE is None:
+        _TEMPLATE_CACHE = read_file(TEMPLATE_PATH)
+    template_json = _TEMPLATE_CACHE
     mcp_client = get_mcp_client()
     if mcp_client is None:
         raise RuntimeError("MCP server not available. Please run agents/itinerary_agent/utils/agent.py and set MCP_SERVER_URL.")
@@ -24,12 +30,11 @@ async def generate_travel_and_stay(user_input: Dict[str, Any]) -> Dict[str, Any]
     # Build strict instruction (prompt-only change to force Firestore lookups via MCP tools)
     parts = []
     parts.append("You are an assistant generating travel and accommodation options.\n")
-    parts.append("Use ONLY these MCP tools: get_travel_options(frm, to, depart_date) and get_accommodation(city).\n")
-    parts.append("Do NOT call any other tools. Do NOT fabricate any values; populate from Firestore documents returned by these tools.\n")
+    parts.append("Use ONLY this MCP tool: get_trip_options(departure, destination, start_date, end_date).\n")
+    parts.append("Do NOT call any other tools. Do NOT fabricate any values; populate from Firestore documents returned by this tool.\n")
     parts.append("Tool calling steps (MANDATORY):\n")
-    parts.append("1) Call get_travel_options(frm=User Input.departure, to=User Input.destination, depart_date=User Input.startDate) for the outbound leg.\n")
-    parts.append("2) Call get_travel_options(frm=User Input.destination, to=User Input.departure, depart_date=User Input.endDate) for the return leg.\n")
-    parts.append("3) Call get_accommodation(city=User Input.destination) to fetch hotels.\n")
+    parts.append("1) Call get_trip_options(departure=User Input.departure, destination=User Input.destination, start_date=User Input.startDate, end_date=User Input.endDate) exactly once.\n")
+    parts.append("2) Use its 'outbound' list for the outbound leg, its 'return' list for the return leg, and its 'accommodation' list for hotels.\n")
     parts.append("Map the raw Firestore fields into the template, preserving ids, names, timings, and prices when present. If any list is empty, leave it empty (the API will enhance with fallbacks).\n")
     parts.append("Output MUST be valid JSON matching the following template strictly (keys and types):\n")
     parts.append("Template: " + template_json + "\n")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Same import roots as the container: the API imports services.* from backend/,
+# and the MCP server imports its sibling modules from its own directory
+sys.path[:0] = [BACKEND, os.path.join(BACKEND, "agents", "itinerary_agent", "utils")]
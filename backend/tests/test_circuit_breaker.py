@@ -0,0 +1,50 @@
+import asyncio
+from unittest import mock
+
+import httpx
+import tenacity
+
+with mock.patch("google.cloud.firestore.Client"):
+    import agent
+
+
+def test_half_open_admits_one_probe():
+    breaker = agent.CircuitBreaker(fail_max=1, reset_timeout=30)
+    with mock.patch.object(agent.time, "monotonic", return_value=100.0):
+        breaker.failure()
+        assert not breaker.allow()
+    with mock.patch.object(agent.time, "monotonic", return_value=131.0):
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.failure()
+        assert not breaker.allow()
+    with mock.patch.object(agent.time, "monotonic", return_value=162.0):
+        assert breaker.allow()
+        breaker.success()
+        assert breaker.allow() and breaker.allow()
+
+
+def test_shared_upstream_failure_counts_once(monkeypatch):
+    breaker = agent.CircuitBreaker(fail_max=2, reset_timeout=30)
+    monkeypatch.setattr(agent, "_places_breaker", breaker)
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(503)
+
+    search = agent._places_search_async.retry_with(stop=tenacity.stop_after_attempt(1))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as session:
+            return await asyncio.gather(
+                *(search("Shared failure", "key", session) for _ in range(10)),
+                return_exceptions=True,
+            )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+    assert calls == 1
+    assert breaker.allow()
@@ -0,0 +1,17 @@
+from api.app import _normalize_prefs
+
+
+def test_empty_alias_falls_through_to_the_next():
+    prefs = _normalize_prefs({"from": "", "fromCity": "Chennai", "to": "", "city": "Pondicherry"})
+    assert prefs["departure"] == "Chennai"
+    assert prefs["destination"] == "Pondicherry"
+
+
+def test_empty_canonical_key_is_kept():
+    prefs = _normalize_prefs({"departure": "", "fromCity": "Chennai"})
+    assert prefs["departure"] == ""
+
+
+def test_empty_activities_alias_falls_through():
+    prefs = _normalize_prefs({"interests": [], "activity": "hiking"})
+    assert prefs["activities"] == ["hiking"]
@@ -0,0 +1,52 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+# Importing the server builds its Firestore pool; keep that from reaching for credentials
+with mock.patch("google.cloud.firestore.Client"):
+    import agent
+
+
+def test_cancelling_the_leader_leaves_waiters_their_result():
+    async def scenario():
+        release = asyncio.Event()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"id": "louvre"}
+
+        leader = asyncio.create_task(agent._singleflight("louvre", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(agent._singleflight("louvre", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await waiter == {"id": "louvre"}
+        assert calls == 1
+        assert not agent._inflight
+
+    asyncio.run(scenario())
+
+
+def test_waiters_share_the_fetch_error():
+    async def scenario():
+        async def fetch():
+            await asyncio.sleep(0)
+            raise ValueError("upstream down")
+
+        results = await asyncio.gather(
+            agent._singleflight("broken", fetch),
+            agent._singleflight("broken", fetch),
+            return_exceptions=True,
+        )
+        assert [type(r) for r in results] == [ValueError, ValueError]
+        assert not agent._inflight
+
+    asyncio.run(scenario())